@@ -1,7 +1,9 @@
+import multiprocessing
 import subprocess
 import sys
 import os
 import pathlib
+import threading
 
 # --- Исправление путей к ресурсам при запуске из .exe (PyInstaller) ---
 if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
@@ -19,16 +21,16 @@ import sys
 from pathlib import Path
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QTabWidget, QVBoxLayout, QHBoxLayout,
-    QLabel, QLineEdit, QPushButton, QDateEdit, QTableWidget, QTableWidgetItem,
+    QLabel, QLineEdit, QPushButton, QDateEdit, QTableView,
     QFileDialog, QMessageBox, QHeaderView, QProgressBar, QDialog, QTextEdit
 )
-from PyQt6.QtCore import Qt, QDate, QThread, pyqtSignal
+from PyQt6.QtCore import Qt, QDate, QThread, pyqtSignal, QAbstractTableModel, QModelIndex
 
 # --- Импорт модулей поиска и индексации ---
 from core.indexer import FileIndexer
 from core.searcher import (
     setup_search_parser, search_index, search_time_range,
-    combined_search, search_by_filename
+    combined_search, search_by_filename, warm_up_nlp
 )
 from config import Config
 
@@ -51,6 +53,104 @@ class IndexThread(QThread):
         except Exception as e:
             self.finished.emit(0, 0, f"Ошибка: {str(e)}")
 
+# --- Поток для оптимизации (слияния сегментов) индекса ---
+class CompactThread(QThread):
+    """Отдельный поток для оптимизации индекса, чтобы не блокировать интерфейс."""
+    finished = pyqtSignal(str)  # message
+
+    def run(self):
+        try:
+            FileIndexer.compact(Config.INDEX_DIR)
+            self.finished.emit("Оптимизация индекса завершена")
+        except Exception as e:
+            self.finished.emit(f"Ошибка: {str(e)}")
+
+# --- Поток для выполнения поискового запроса ---
+class SearchThread(QThread):
+    """
+    Отдельный поток для выполнения поиска, чтобы не блокировать интерфейс.
+    Запросы к общему searcher выполняются по очереди (под блокировкой);
+    если до начала или во время выполнения запрошено прерывание, результат не отправляется.
+    """
+    results_ready = pyqtSignal(list)
+    _lock = threading.Lock()
+
+    def __init__(self, search_func, *args):
+        super().__init__()
+        self.search_func = search_func
+        self.args = args
+
+    def run(self):
+        with SearchThread._lock:
+            if self.isInterruptionRequested():
+                return
+            try:
+                results = self.search_func(*self.args)
+            except Exception as e:
+                print(f"Ошибка поиска: {e}")
+                results = []
+        if not self.isInterruptionRequested():
+            self.results_ready.emit(list(results))
+
+# --- Модель данных для таблицы результатов поиска ---
+class ResultsModel(QAbstractTableModel):
+    """
+    Модель результатов поиска для QTableView.
+    Строки хранятся как список SearchResult, а текст ячеек формируется
+    только для тех строк, которые представление действительно отображает.
+    Отформатированный текст строки кэшируется: data() вызывается при каждой перерисовке.
+    """
+    HEADERS = ("Имя", "Релевантность", "Дата изменения")
+    DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._display = []
+
+    def set_rows(self, results):
+        """Заменяет содержимое модели новыми результатами поиска."""
+        self.beginResetModel()
+        self._rows = list(results)
+        self._display = [None] * len(self._rows)
+        self.endResetModel()
+
+    def _format_row(self, row):
+        """Возвращает (и кэширует) текст ячеек строки."""
+        cached = self._display[row]
+        if cached is None:
+            result = self._rows[row]
+            score = result.score
+            last_modified = result.last_modified
+            cached = (
+                result.path,
+                f"{score:.2f}" if score is not None else "",
+                last_modified.strftime(self.DATE_FORMAT) if hasattr(last_modified, 'strftime')
+                else str(last_modified or '')
+            )
+            self._display[row] = cached
+        return cached
+
+    def path_at(self, row):
+        """Возвращает путь к файлу в указанной строке."""
+        return self._rows[row].path
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+        return self._format_row(index.row())[index.column()]
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+
 # --- Основное окно приложения ---
 class FileSearchApp(QMainWindow):
     """Главный класс GUI поисковой системы."""
@@ -60,11 +160,15 @@ class FileSearchApp(QMainWindow):
         self.setMinimumSize(800, 500)
 
         # --- Индекс и парсер ---
+        # Модели Natasha загружаются в фоне, пока открывается индекс и строится интерфейс
+        warm_up_nlp()
         Config.INDEX_DIR.mkdir(exist_ok=True)
         self.ix = FileIndexer.get_index(Config.INDEX_DIR)
         if self.ix.is_empty():
             print("Индекс пуст. Выполните индексацию.")
         self.parser = setup_search_parser(self.ix.schema)
+        # Долгоживущий searcher: читатели сегментов открываются один раз, а не на каждый запрос
+        self.searcher = self.ix.searcher()
 
         # --- Основной layout ---
         central_widget = QWidget()
@@ -90,22 +194,31 @@ class FileSearchApp(QMainWindow):
         main_layout.addWidget(self.tabs)
 
         # --- Таблица для отображения результатов поиска ---
-        self.results_table = QTableWidget(0, 3)
-        self.results_table.setHorizontalHeaderLabels(["Имя", "Релевантность", "Дата изменения"])
+        self.results_model = ResultsModel(self)
+        self.results_table = QTableView()
+        self.results_table.setModel(self.results_model)
         self.results_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
         self.results_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
         self.results_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)
-        self.results_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.results_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
         self.results_table.setAlternatingRowColors(True)
         self.results_table.setStyleSheet("font-size: 11px; padding: 2px;")
         self.results_table.hide()
         main_layout.addWidget(self.results_table)
-        self.results_table.cellDoubleClicked.connect(self.open_file_from_result)
+        self.results_table.doubleClicked.connect(self.open_file_from_result)
+
+        # --- Меню обслуживания индекса ---
+        index_menu = self.menuBar().addMenu("Индекс")
+        self.compact_action = index_menu.addAction("Оптимизировать индекс")
+        self.compact_action.triggered.connect(self.start_compact)
 
         self.setCentralWidget(central_widget)
         self.setStyleSheet(self.dark_stylesheet())
 
         self.index_thread = None
+        self.compact_thread = None
+        self.search_thread = None
+        self.search_threads = set()  # Ссылки на выполняющиеся потоки поиска
 
     def dark_stylesheet(self):
         """CSS-стили для тёмной темы интерфейса."""
@@ -153,14 +266,14 @@ class FileSearchApp(QMainWindow):
         QPushButton:hover {
             background-color: #5f73bc;
         }
-        QTableWidget {
+        QTableView {
             background-color: #23272a;
             alternate-background-color: #252525;
             gridline-color: #333;
             color: #e0e0e0;
             font-size: 11px;
         }
-        QTableWidget::item {
+        QTableView::item {
             padding: 1px;
         }
         QHeaderView::section {
@@ -298,6 +411,7 @@ class FileSearchApp(QMainWindow):
         self.progress_bar.setValue(0)
         self.progress_bar.show()
         self.tabs.setEnabled(False)
+        self.compact_action.setEnabled(False)
 
         self.index_thread = IndexThread(dir_path)
         self.index_thread.progress.connect(self.progress_bar.setValue)
@@ -308,41 +422,87 @@ class FileSearchApp(QMainWindow):
         """Обработка завершения индексации: обновляет индекс и интерфейс."""
         self.progress_bar.hide()
         self.tabs.setEnabled(True)
+        self.compact_action.setEnabled(True)
         QMessageBox.information(self, "Индексация", f"{message}\nУспешно: {success}, Ошибок: {failed}")
-        # Обновить индекс и парсер после индексации
-        self.ix = FileIndexer.get_index(Config.INDEX_DIR)
-        self.parser = setup_search_parser(self.ix.schema)
+        # Переоткрывать индекс и пересоздавать парсер не нужно: схема неизменна.
+        # Searcher обновляется до нового поколения индекса с переиспользованием читателей.
+        self.refresh_searcher()
+
+    def start_compact(self):
+        """Запускает оптимизацию индекса (слияние сегментов) в отдельном потоке."""
+        self.progress_bar.setRange(0, 0)  # Неопределённый прогресс
+        self.progress_bar.show()
+        self.tabs.setEnabled(False)
+        self.compact_action.setEnabled(False)
+
+        self.compact_thread = CompactThread()
+        self.compact_thread.finished.connect(self.on_compact_finished)
+        self.compact_thread.start()
+
+    def on_compact_finished(self, message):
+        """Обработка завершения оптимизации: обновляет индекс и интерфейс."""
+        self.progress_bar.hide()
+        self.progress_bar.setRange(0, 100)
+        self.tabs.setEnabled(True)
+        self.compact_action.setEnabled(True)
+        QMessageBox.information(self, "Оптимизация", message)
+        self.refresh_searcher()
+
+    def refresh_searcher(self):
+        """
+        Переключает searcher на актуальное поколение индекса после его изменения.
+        refresh() закрывает читатели сегментов, которые больше не нужны, поэтому обновление
+        выполняется под блокировкой SearchThread._lock, когда ни один запрос не выполняется.
+        Поиски, ожидающие очереди, прерываются: они получили прежний searcher.
+        """
+        for thread in list(self.search_threads):
+            thread.requestInterruption()
+        with SearchThread._lock:
+            # Прежний searcher освобождается самим refresh(): его неиспользуемые читатели закрыты,
+            # а остальные переходят к новому searcher, поэтому close() для него не вызывается
+            self.searcher = self.searcher.refresh()
+
+    def closeEvent(self, event):
+        """Закрывает searcher и освобождает файлы индекса при закрытии окна."""
+        for thread in list(self.search_threads):
+            thread.requestInterruption()
+            thread.wait()
+        self.searcher.close()
+        super().closeEvent(event)
 
     def display_results(self, results):
         """Отображает результаты поиска в таблице."""
-        self.results_table.setRowCount(0)
-        for i, result in enumerate(results):
-            self.results_table.insertRow(i)
-            path_item = QTableWidgetItem(result.get('path', ''))
-            score_item = QTableWidgetItem(f"{result.get('score', 0):.2f}" if 'score' in result else "")
-            date_item = QTableWidgetItem(str(result.get('last_modified', '')))
-            self.results_table.setItem(i, 0, path_item)
-            self.results_table.setItem(i, 1, score_item)
-            self.results_table.setItem(i, 2, date_item)
+        # Модель сбрасывается одним сигналом, ячейки создаются только для видимых строк
+        self.results_model.set_rows(results)
         self.results_table.show()
 
+    def run_search(self, search_func, *args):
+        """
+        Запускает поиск в отдельном потоке.
+        Предыдущий незавершённый поиск отменяется: его результаты не будут показаны.
+        """
+        if self.search_thread is not None:
+            self.search_thread.requestInterruption()
+        thread = SearchThread(search_func, *args)
+        thread.results_ready.connect(self.display_results)
+        thread.finished.connect(lambda: self.search_threads.discard(thread))
+        self.search_threads.add(thread)
+        self.search_thread = thread
+        thread.start()
+
     def search_keywords(self):
         """Поиск по ключевым словам."""
         query = self.keywords_input.text()
         if not query:
             QMessageBox.warning(self, "Внимание", "Введите поисковый запрос!")
             return
-        with self.ix.searcher() as searcher:
-            results = search_index(searcher, self.parser, query)
-        self.display_results(results)
+        self.run_search(search_index, self.searcher, self.parser, query)
 
     def search_date(self):
         """Поиск по диапазону дат."""
         start_date = self.start_date.date().toString("yyyy-MM-dd")
         end_date = self.end_date.date().toString("yyyy-MM-dd")
-        with self.ix.searcher() as searcher:
-            results = search_time_range(searcher, start_date, end_date)
-        self.display_results(results)
+        self.run_search(search_time_range, self.searcher, start_date, end_date)
 
     def search_combined(self):
         """Комбинированный поиск: по ключевым словам и дате."""
@@ -355,9 +515,7 @@ class FileSearchApp(QMainWindow):
             'end_date': end_date,
             'limit': 10
         }
-        with self.ix.searcher() as searcher:
-            results = combined_search(searcher, self.parser, params)
-        self.display_results(results)
+        self.run_search(combined_search, self.searcher, self.parser, params)
 
     def search_filename(self):
         """Поиск по имени файла."""
@@ -365,16 +523,13 @@ class FileSearchApp(QMainWindow):
         if not filename:
             QMessageBox.warning(self, "Внимание", "Введите имя файла!")
             return
-        with self.ix.searcher() as searcher:
-            results = search_by_filename(searcher, filename)
-        self.display_results(results)
+        self.run_search(search_by_filename, self.searcher, filename)
 
-    def open_file_from_result(self, row, column):
+    def open_file_from_result(self, index):
         """Открывает файл из результатов поиска двойным кликом."""
-        path_item = self.results_table.item(row, 0)
-        if not path_item:
+        if not index.isValid():
             return
-        path = path_item.text()
+        path = self.results_model.path_at(index.row())
         if not os.path.exists(path):
             QMessageBox.warning(self, "Ошибка", "Файл не найден!")
             return
@@ -392,6 +547,8 @@ class FileSearchApp(QMainWindow):
 
 # --- Точка входа в приложение ---
 if __name__ == "__main__":
+    # Необходимо для пула процессов индексации в собранном .exe (PyInstaller)
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     window = FileSearchApp()
     window.show()
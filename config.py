@@ -9,6 +9,10 @@ class Config:
     BASE_DIR = Path(__file__).parent
     # Директория для хранения индекса Whoosh
     INDEX_DIR = BASE_DIR / "indexdir"
+    # База SQLite с кэшем извлечённого из PDF текста (ключ: путь, размер, время изменения)
+    EXTRACT_CACHE_PATH = INDEX_DIR / "extract_cache.db"
+    # База SQLite с отметками (время изменения, размер) проиндексированных файлов
+    STAMPS_PATH = INDEX_DIR / "stamps.db"
 
     # --- Поддерживаемые форматы файлов для индексации ---
     SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.txt')
@@ -16,8 +20,16 @@ class Config:
     # --- Настройки кэширования ---
     MAX_CACHE_SIZE = 1000   # Максимальное количество элементов в кэше синонимов и переводов
     MAX_SYNONYMS = 5        # Максимальное количество синонимов для расширенного поиска
+    MAX_QUERY_TERMS = 32    # Максимальное количество различных слов запроса, расширяемых синонимами
     TRANSLATION_CACHE: Dict[str, str] = {}  # Кэш для переводов слов (если используется)
     SYNONYM_CACHE: Dict[str, Any] = {}      # Кэш для синонимов слов
+    SYNONYM_CACHE_LIMIT = 1_000_000  # Количество слов в кэше синонимов, при превышении которого кэш очищается
+    SYNONYM_CACHE_PATH = INDEX_DIR / "synonyms.db"  # Дисковый кэш синонимов (сохраняется между запусками)
+    SYNONYM_PRELOAD_SIZE = 200  # Количество самых частых слов, синонимы которых загружаются в память при старте
+    SYNONYM_MISS_CACHE_SIZE = 10000  # Максимальное количество запоминаемых слов без синонимов
+    SYNONYM_THREADS = 4     # Количество потоков для параллельного получения синонимов слов запроса
+    QUERY_CACHE_SIZE = 1000 # Максимальное количество построенных запросов Whoosh в кэше (на один парсер)
+    SYNONYM_PARALLEL_MIN_WORDS = 3  # Минимальное число слов запроса, начиная с которого синонимы ищутся в потоках
 
     # --- Оптимизация обработки PDF ---
     PDF_TEXT_LIMIT = 5000   # Максимальное количество символов текста, извлекаемого с одной страницы PDF
@@ -26,6 +38,9 @@ class Config:
     PDF_X_TOLERANCE = 1     # Параметр точности по горизонтали при извлечении текста из PDF (pdfplumber)
     PDF_Y_TOLERANCE = 1     # Параметр точности по вертикали при извлечении текста из PDF (pdfplumber)
     PDF_LAYOUT = False      # Флаг, влияющий на режим извлечения текста (ускорение или точность)
+    PDF_PAGE_THREADS = 4    # Количество потоков для извлечения страниц одного большого PDF (pdfplumber)
+    PDF_PARALLEL_MIN_PAGES = 40 # Минимальное число страниц, начиная с которого страницы PDF обрабатываются в потоках
+    PDF_GC_MIN_SIZE = 50_000_000  # Размер PDF в байтах, после резервного извлечения которого принудительно запускается сборщик мусора
 
     # --- Настройки для DOCX и TXT файлов ---
     MAX_TEXT_LENGTH = 10_000_000    # Максимальная длина текста для индексации (примерно 10 МБ)
@@ -34,5 +49,9 @@ class Config:
     FILE_SEARCH_LIMIT = 50  # Максимальное количество результатов при поиске по имени файла
 
     # --- Параллельная обработка файлов ---
-    WORKERS = min(os.cpu_count() or 4, 8)   # Количество потоков для многопоточной обработки (от 4 до 8)
+    WORKERS = min(os.cpu_count() or 4, 8)   # Количество процессов для параллельной обработки (от 4 до 8)
     BATCH_SIZE = 100    # Размер пакета файлов для пакетной обработки
+    INDEX_CHUNK_SIZE = 32   # Максимальное число файлов в пакете, передаваемом процессу-обработчику за раз
+    INDEX_CHUNKS_IN_FLIGHT = 2  # Число пакетов на процесс, которые одновременно находятся в обработке
+    WORKER_MAX_FILES = 200  # Число файлов, после обработки которых процесс-обработчик перезапускается (Python 3.11+)
+    WRITER_LIMIT_MB = 512   # Общий объём буфера в памяти (МБ) всех процессов записи Whoosh до сброса сегментов на диск
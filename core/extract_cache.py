@@ -0,0 +1,56 @@
+import sqlite3
+from pathlib import Path
+from typing import Optional
+
+from config import Config
+from .utils import print_error
+
+# Соединение открывается лениво, отдельно в каждом процессе пула индексации
+_connection: Optional[sqlite3.Connection] = None
+
+
+def _get_connection() -> sqlite3.Connection:
+    """
+    Открывает (при первом обращении) базу кэша извлечённого текста.
+    Режим WAL позволяет нескольким процессам читать базу одновременно с записью.
+    """
+    global _connection
+    if _connection is None:
+        Config.INDEX_DIR.mkdir(parents=True, exist_ok=True)
+        _connection = sqlite3.connect(Config.EXTRACT_CACHE_PATH, timeout=30)
+        _connection.execute("PRAGMA journal_mode=WAL")
+        _connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime REAL, text TEXT)"
+        )
+    return _connection
+
+
+def get_cached_text(file_path: Path, size: int, mtime: float) -> Optional[str]:
+    """
+    Возвращает ранее извлечённый текст файла, если размер и время изменения не поменялись.
+    Иначе возвращает None.
+    """
+    try:
+        row = _get_connection().execute(
+            "SELECT text FROM cache WHERE path=? AND size=? AND mtime=?",
+            (str(file_path), size, mtime)
+        ).fetchone()
+        return row[0] if row else None
+    except sqlite3.Error as e:
+        print_error(f"Ошибка чтения кэша извлечения {file_path}: {e}")
+        return None
+
+
+def store_text(file_path: Path, size: int, mtime: float, text: str) -> None:
+    """
+    Сохраняет извлечённый текст файла вместе с его размером и временем изменения.
+    """
+    try:
+        with _get_connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (path, size, mtime, text) VALUES (?, ?, ?, ?)",
+                (str(file_path), size, mtime, text)
+            )
+    except sqlite3.Error as e:
+        print_error(f"Ошибка записи кэша извлечения {file_path}: {e}")
@@ -0,0 +1,22 @@
+import string
+
+# Таблица перекодировки байтов UTF-8 для предварительной нормализации текста:
+# - заглавные ASCII-буквы приводятся к нижнему регистру;
+# - ASCII-символы, не являющиеся буквой, цифрой или '_', заменяются пробелом;
+# - байты >= 0x80 (многобайтовые символы, например кириллица) не изменяются.
+# '_' сохраняется, так как входит в \w: анализатор запроса оставляет "my_report" одним термином,
+# и в индексе слово должно остаться таким же
+_KEEP = frozenset((string.ascii_letters + string.digits + '_').encode('ascii'))
+_NORMALIZE_TABLE = bytes(
+    b if b >= 0x80 else (ord(chr(b).lower()) if b in _KEEP else 0x20)
+    for b in range(256)
+)
+
+
+def normalize(text: str) -> str:
+    """
+    Быстрая нормализация текста перед передачей в анализатор Whoosh.
+    Выполняется одним проходом bytes.translate на уровне C, без цикла Python по символам.
+    Возвращает текст в нижнем регистре (для ASCII) без знаков препинания.
+    """
+    return text.encode('utf-8', 'ignore').translate(_NORMALIZE_TABLE).decode('utf-8', 'ignore')
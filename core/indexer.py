@@ -1,103 +1,342 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import gc
+import io
+import mmap
+import multiprocessing
+import os
+import sys
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Iterator, Dict, NamedTuple
 from typing import Optional, Tuple, Callable
+from xml.etree.ElementTree import iterparse
 
 import pdfplumber
-from docx import Document as DocxDocument
+import pypdfium2 as pdfium
+from pdfminer.high_level import extract_text as pdfminer_extract_text
 from whoosh import index
 from whoosh.writing import IndexWriter
 
 from config import Config
 from models.schemas import search_schema
+from .extract_cache import get_cached_text, store_text
+from .fast_text import normalize
+from .stamps import load_stamps, save_stamps, clear_stamps
 from .utils import print_error, print_success
 
+# Пространство имён WordprocessingML для разбора word/document.xml
+_W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_W_TEXT = _W_NS + 't'
+_W_PARAGRAPH = _W_NS + 'p'
+_W_BODY = _W_NS + 'body'
+# Табуляция и переносы строк внутри параграфа: заменяются пробелом, чтобы слова не склеивались
+_W_BREAKS = frozenset((_W_NS + 'tab', _W_NS + 'br', _W_NS + 'cr'))
+
+# Множество поддерживаемых расширений для проверки за O(1)
+_SUPPORTED_EXTENSIONS = frozenset(Config.SUPPORTED_EXTENSIONS)
+
+
+class FileEntry(NamedTuple):
+    """
+    Файл для индексации вместе с размером и временем изменения.
+    Значения берутся из одного вызова stat при обходе директории
+    и передаются дальше, чтобы не запрашивать их повторно.
+    """
+    path: Path
+    size: int
+    mtime: float
+
+    @classmethod
+    def from_path(cls, path: Path) -> 'FileEntry':
+        """Создает запись по пути, выполняя stat."""
+        st = path.stat()
+        return cls(path, st.st_size, st.st_mtime)
+
+
+def process_file(entry: FileEntry) -> Optional[Tuple[str, str, Optional[str], datetime]]:
+    """
+    Извлекает текст и метаданные из одного файла.
+    Вынесена на уровень модуля, чтобы её можно было передать в дочерний процесс (pickle).
+    Путь должен быть абсолютным (см. _get_files_to_index), поэтому resolve() не вызывается.
+    Время изменения берётся из записи, без повторного stat.
+    Имя файла приводится к единому виду (str.casefold) уже при индексации.
+    Возвращает кортеж (path, filename, content, last_modified) или None при ошибке.
+    Кортеж вместо словаря дешевле в создании и при передаче между процессами.
+    """
+    try:
+        content = FileIndexer._extract_text(entry)
+        last_modified = datetime.fromtimestamp(entry.mtime)
+        return str(entry.path), entry.path.name.casefold(), content, last_modified
+    except Exception as e:
+        print_error(f"Ошибка обработки файла {entry.path}: {e}")
+        return None
+
+
+def process_chunk(entries: List[FileEntry]) -> List[Optional[Tuple[str, str, Optional[str], datetime]]]:
+    """
+    Обрабатывает пакет файлов в дочернем процессе (см. process_file).
+    Возвращает результаты в порядке переданных файлов.
+    """
+    return [process_file(entry) for entry in entries]
+
 
 class FileIndexer:
     """Класс для индексации файлов различных форматов (PDF, DOCX, TXT) с использованием Whoosh."""
 
     @staticmethod
-    def extract_pdf_text(file_path: Path) -> Optional[str]:
+    def extract_pdf_text(file_path: Path, size: Optional[int] = None) -> Optional[str]:
         """
         Извлекает текст из PDF-файла с учетом ограничений по размеру и количеству страниц.
-        Проверяет минимальный размер файла, затем открывает PDF через pdfplumber.
-        Извлекает текст с каждой страницы (до максимального числа страниц).
-        Ограничивает длину текста с каждой страницы.
-        Возвращает объединенный текст или None, если текст не найден или файл слишком мал.
+        Проверяет минимальный размер файла (известный размер можно передать в size,
+        чтобы не выполнять stat повторно), затем извлекает текст через PDFium (pypdfium2):
+        C++-парсер не разбирает графические операторы, поэтому работает быстрее pdfminer.six
+        и не удерживает память между файлами.
+        Если PDFium завершается с ошибкой или не находит текста, используется pdfminer.six/pdfplumber.
+        Возвращает текст или None, если текст не найден или файл слишком мал.
         """
         try:
-            if file_path.stat().st_size < Config.PDF_MIN_SIZE:
+            if size is None:
+                size = file_path.stat().st_size
+            if size < Config.PDF_MIN_SIZE:
                 return None
+        except OSError as e:
+            print(f"Ошибка обработки PDF {file_path}: {e}")
+            return None
+
+        try:
+            text = FileIndexer._extract_pdf_text_pdfium(file_path)
+            if text:
+                return text
+        except Exception as e:
+            print(f"Ошибка PDFium для {file_path}, используется pdfminer: {e}")
+
+        text = FileIndexer._extract_pdf_text_pdfminer(file_path)
+        if size > Config.PDF_GC_MIN_SIZE:
+            # Структуры документа pdfminer содержат циклические ссылки и освобождаются
+            # только сборщиком мусора; для больших файлов он запускается сразу
+            gc.collect()
+        return text
+
+    @staticmethod
+    def _extract_pdf_text_pdfium(file_path: Path) -> Optional[str]:
+        """
+        Извлекает текст из PDF через PDFium постранично.
+        Текстовые страницы и сами страницы закрываются сразу после чтения.
+        Возвращает объединенный текст или None, если текст не найден.
+        """
+        text_limit = Config.PDF_TEXT_LIMIT
+        full_text = []
+        pdf = pdfium.PdfDocument(str(file_path))
+        try:
+            for i in range(min(len(pdf), Config.PDF_MAX_PAGES)):
+                page = pdf[i]
+                textpage = page.get_textpage()
+                text = textpage.get_text_range()
+                textpage.close()
+                page.close()
+                if text:
+                    full_text.append(text[:text_limit])
+        finally:
+            pdf.close()
+        text = " ".join(full_text)
+        return text if text.strip() else None
+
+    @staticmethod
+    def _extract_pdf_text_pdfminer(file_path: Path) -> Optional[str]:
+        """
+        Резервное извлечение текста из PDF напрямую через pdfminer.six,
+        без алгоритма группировки символов pdfplumber (точная раскладка для индекса не нужна).
+        Если pdfminer завершается с ошибкой, используется pdfplumber.
+        """
+        try:
+            text = pdfminer_extract_text(str(file_path), maxpages=Config.PDF_MAX_PAGES)
+            text = text[:Config.PDF_TEXT_LIMIT * Config.PDF_MAX_PAGES]
+            return text if text.strip() else None
+        except Exception as e:
+            print(f"Ошибка pdfminer для {file_path}, используется pdfplumber: {e}")
+            return FileIndexer._extract_pdf_text_pdfplumber(file_path)
 
-            full_text = []
+    @staticmethod
+    def _extract_pdf_text_pdfplumber(file_path: Path) -> Optional[str]:
+        """
+        Резервное извлечение текста из PDF через pdfplumber.
+        Извлекает текст с каждой страницы (до максимального числа страниц).
+        Большие документы делятся на диапазоны страниц, которые обрабатываются в потоках;
+        каждый поток открывает PDF самостоятельно, так как объекты страниц одного
+        документа разделяют общий парсер и файловый дескриптор.
+        Ограничивает длину текста с каждой страницы.
+        Возвращает объединенный текст или None, если текст не найден.
+        """
+        try:
             with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages[:Config.PDF_MAX_PAGES]:
-                    try:
-                        text = page.extract_text(
-                            x_tolerance=Config.PDF_X_TOLERANCE,
-                            y_tolerance=Config.PDF_Y_TOLERANCE
-                        )
-                        if text:
-                            full_text.append(text[:Config.PDF_TEXT_LIMIT])
-                    except Exception as e:
-                        print(f"Ошибка на странице: {e}")
-                        continue
+                page_count = min(len(pdf.pages), Config.PDF_MAX_PAGES)
+                if page_count < Config.PDF_PARALLEL_MIN_PAGES:
+                    full_text = FileIndexer._extract_pdf_pages(pdf, 0, page_count)
+                    return " ".join(full_text) if full_text else None
+
+            step = -(-page_count // Config.PDF_PAGE_THREADS)
+            ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+            with ThreadPoolExecutor(max_workers=Config.PDF_PAGE_THREADS) as executor:
+                parts = executor.map(lambda r: FileIndexer._extract_pdf_page_range(file_path, *r), ranges)
+                full_text = [text for part in parts for text in part]
 
             return " ".join(full_text) if full_text else None
         except Exception as e:
             print(f"Ошибка обработки PDF {file_path}: {e}")
             return None
 
+    @staticmethod
+    def _extract_pdf_page_range(file_path: Path, start: int, stop: int) -> List[str]:
+        """
+        Открывает PDF отдельным дескриптором и извлекает текст страниц [start, stop).
+        Используется для параллельной обработки диапазонов страниц в потоках.
+        """
+        with pdfplumber.open(file_path) as pdf:
+            return FileIndexer._extract_pdf_pages(pdf, start, stop)
+
+    @staticmethod
+    def _extract_pdf_pages(pdf, start: int, stop: int) -> List[str]:
+        """
+        Извлекает текст страниц [start, stop) открытого документа pdfplumber.
+        Ошибки на отдельных страницах пропускаются.
+        Каждая страница закрывается сразу после извлечения: pdfplumber хранит кэш
+        символов страницы до закрытия документа, и без этого память растет
+        пропорционально размеру всего документа.
+        """
+        x_tolerance = Config.PDF_X_TOLERANCE
+        y_tolerance = Config.PDF_Y_TOLERANCE
+        text_limit = Config.PDF_TEXT_LIMIT
+        full_text = []
+        for page in pdf.pages[start:stop]:
+            try:
+                text = page.extract_text(x_tolerance=x_tolerance, y_tolerance=y_tolerance)
+                if text:
+                    full_text.append(text[:text_limit])
+            except Exception as e:
+                print(f"Ошибка на странице: {e}")
+                continue
+            finally:
+                # close() сбрасывает кэши страницы (flush_cache) и текстовой раскладки
+                page.close()
+        return full_text
+
     @staticmethod
     def extract_docx_text(file_path: Path) -> str:
         """
         Извлекает текст из DOCX-файла.
-        Читает все параграфы документа, аккумулирует текст.
-        Для контроля памяти при больших документах объединяет текст каждые 100 параграфов.
+        Потоково разбирает word/document.xml внутри zip-архива, не строя полное дерево документа.
+        Собирает текстовые узлы w:t; параграфы, табуляции (w:tab) и переносы строк
+        (w:br, w:cr) заменяются пробелом.
+        Обработанные параграфы очищаются, а после каждого блока верхнего уровня (параграф,
+        таблица) очищается w:body, поэтому в памяти остается только текущий блок.
         Возвращает текст, обрезанный по максимальной длине из конфигурации.
         """
         try:
-            doc = DocxDocument(file_path)
-            parts = []
-            for para in doc.paragraphs:
-                if para.text:
-                    parts.append(para.text)
-                    # Контроль памяти для больших документов
-                    if len(parts) > 100:
-                        parts = [" ".join(parts)]
-            return " ".join(parts)[:Config.MAX_TEXT_LENGTH]
+            buf = io.StringIO()
+            written = 0
+            body = None
+            depth = 0
+            with zipfile.ZipFile(file_path) as archive, archive.open('word/document.xml') as xml:
+                for event, elem in iterparse(xml, events=('start', 'end')):
+                    if event == 'start':
+                        depth += 1
+                        if elem.tag == _W_BODY:
+                            body = elem
+                        continue
+                    depth -= 1
+                    if depth == 2 and body is not None:
+                        # Завершен блок верхнего уровня внутри w:body (document -> body -> блок)
+                        if elem.tag == _W_PARAGRAPH:
+                            written += buf.write(" ")
+                        body.clear()
+                    elif elem.tag == _W_TEXT:
+                        if elem.text:
+                            written += buf.write(elem.text)
+                    elif elem.tag in _W_BREAKS:
+                        written += buf.write(" ")
+                    elif elem.tag == _W_PARAGRAPH:
+                        written += buf.write(" ")
+                        elem.clear()
+                    else:
+                        continue
+                    # Лимит проверяется после каждой записи, а не только в конце параграфа,
+                    # чтобы один огромный параграф не читался целиком
+                    if written >= Config.MAX_TEXT_LENGTH:
+                        break
+            return buf.getvalue()[:Config.MAX_TEXT_LENGTH]
         except Exception as e:
             print_error(f"DOCX processing error {file_path}: {e}")
             return ""
 
     @staticmethod
-    def create_or_open_index(index_dir: Path) -> index.Index:
+    def extract_txt_text(file_path: Path) -> str:
         """
-        Создает новый индекс Whoosh в указанной директории.
-        Если директория не существует, создает ее.
-        Возвращает объект индекса.
+        Извлекает текст из TXT-файла.
+        Файлы не длиннее максимальной длины из конфигурации читаются целиком
+        одним вызовом read(), так как настройка mmap для них дороже самого чтения.
+        Большие файлы отображаются в память (mmap), и декодируется только срез
+        максимальной длины — без промежуточного текстового буфера Python.
         """
-        if not index_dir.exists():
-            index_dir.mkdir(parents=True)
-        return index.create_in(index_dir, schema=search_schema)
+        with open(file_path, 'rb') as f:
+            size = f.seek(0, 2)
+            if size <= Config.MAX_TEXT_LENGTH:
+                # Сюда же попадают файлы нулевой длины, которые mmap не поддерживает
+                f.seek(0)
+                return f.read().decode('utf-8', 'ignore')
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return mm[:Config.MAX_TEXT_LENGTH].decode('utf-8', 'ignore')
 
     @staticmethod
-    def get_index(index_dir):
+    def _open_index(index_dir: Path) -> index.Index:
+        """
+        Открывает существующий индекс.
+        Если индекс создан с устаревшей схемой, он пересоздается: содержимое будет
+        проиндексировано заново при следующей индексации.
+        """
+        ix = index.open_dir(index_dir)
+        if not FileIndexer._schema_matches(ix.schema):
+            print_error("Схема индекса устарела, индекс будет создан заново")
+            return FileIndexer._create_index(index_dir)
+        return ix
+
+    @staticmethod
+    def _schema_matches(schema) -> bool:
+        """
+        Проверяет, что схема индекса совпадает с текущей схемой search_schema.
+        Сравнение полей Whoosh не учитывает анализаторы, поэтому они сравниваются
+        отдельно: иначе изменение стоп-слов или размеров n-грамм не было бы замечено.
+        """
+        if schema != search_schema:
+            return False
+        return all(
+            getattr(schema[name], 'analyzer', None) == getattr(search_schema[name], 'analyzer', None)
+            for name in search_schema.names()
+        )
+
+    @staticmethod
+    def _create_index(index_dir: Path) -> index.Index:
+        """
+        Создает новый пустой индекс.
+        Отметки проиндексированных файлов сбрасываются, чтобы все файлы были проиндексированы заново.
+        """
+        ix = index.create_in(index_dir, schema=search_schema)
+        clear_stamps()
+        return ix
+
+    @staticmethod
+    def get_index(index_dir: Path) -> index.Index:
         """
         Открывает существующий индекс или создает новый, если индекс отсутствует.
+        Если директория не существует, создает ее.
         Обрабатывает ошибки открытия индекса.
         Возвращает объект индекса.
         """
         try:
-            if not index_dir.exists():
-                index_dir.mkdir(parents=True)
-                return index.create_in(index_dir, schema=search_schema)
-
+            index_dir.mkdir(parents=True, exist_ok=True)
             if index.exists_in(index_dir):
-                return index.open_dir(index_dir)
-
-            return index.create_in(index_dir, schema=search_schema)
+                return FileIndexer._open_index(index_dir)
+            return FileIndexer._create_index(index_dir)
         except Exception as e:
             print_error(f"Ошибка открытия индекса: {e}")
             raise
@@ -105,83 +344,200 @@ class FileIndexer:
     @staticmethod
     def index_files(directory: Path, progress_callback: Callable[[int], None] = None) -> Tuple[int, int]:
         """
-        Основной метод индексации файлов из директории с многопоточной обработкой.
+        Основной метод индексации файлов из директории с многопроцессной обработкой.
         - Получает список файлов для индексации.
+        - Пропускает файлы, которые уже проиндексированы с тем же временем изменения и размером
+          (по отметкам в stamps.db), и удаляет из индекса файлы директории, которых больше нет на диске.
         - Параллельно извлекает текст и метаданные из файлов.
-        - Записывает документы в индекс в однопоточном режиме.
+        - Записывает документы в индекс по мере извлечения (потоково).
         - Вызывает callback с прогрессом, если он передан.
-        - Оптимизирует индекс при большом количестве файлов.
         - Возвращает количество успешно и неуспешно обработанных файлов.
         """
+        # Корень приводится к абсолютному пути один раз, тогда все найденные пути уже абсолютные
+        directory = directory.resolve()
         files = FileIndexer._get_files_to_index(directory)
         if not files:
             print_error("Поддерживаемые файлы не найдены")
             return 0, 0
 
-        ix = FileIndexer.create_or_open_index(Config.INDEX_DIR)
-        docs: List[Dict[str, Any]] = []
+        ix = FileIndexer.get_index(Config.INDEX_DIR)
         success = 0
         failed = 0
 
-        def process_file(file_path: Path) -> Dict[str, Any]:
-            # Вспомогательная функция для извлечения текста и метаданных из одного файла
-            try:
-                content = FileIndexer._extract_text(file_path)
-                last_modified = datetime.fromtimestamp(file_path.stat().st_mtime)
-                return {
-                    'path': str(file_path.resolve()),
-                    'filename': file_path.name,
-                    'content': content,
-                    'last_modified': last_modified
-                }
-            except Exception as e:
-                print_error(f"Ошибка обработки файла {file_path}: {e}")
-                return None
+        # Инкрементальная индексация: обрабатываются только новые и изменённые файлы
+        stamps = load_stamps()
+        paths = {str(f.path): f for f in files}
+        files = [
+            f for p, f in paths.items()
+            if stamps.get(p) != (f.mtime, f.size)
+        ]
+        root = str(directory) + os.sep
+        removed = [p for p in stamps if p.startswith(root) and p not in paths]
+        indexed: List[Tuple[str, float, int]] = []
+
+        if not files and not removed:
+            print_success("Изменённых файлов нет, индекс актуален")
+            if progress_callback:
+                progress_callback(100)
+            return 0, 0
 
         total_files = len(files)
         processed = 0
 
-        # Многопоточная обработка файлов для ускорения извлечения текста
-        with ThreadPoolExecutor(max_workers=Config.WORKERS) as executor:
-            futures = [executor.submit(process_file, f) for f in files]
-            for future in as_completed(futures):
-                doc = future.result()
-                if doc:
-                    docs.append(doc)
-                    success += 1
-                else:
-                    failed += 1
-                processed += 1
-                if progress_callback:
-                    progress = int(processed / total_files * 100)
-                    progress_callback(progress)
-
-        # Запись всех документов в индекс в однопоточном режиме
-        with ix.writer() as writer:
-            for doc in docs:
-                writer.update_document(**doc)
+        # Документы пишутся в индекс по мере готовности, без накопления всего корпуса в памяти.
+        # Запись распределяется по нескольким процессам Whoosh, каждый из которых пишет свой сегмент.
+        # limitmb задает буфер одного процесса записи, поэтому общий объем делится между ними
+        writer = ix.writer(procs=Config.WORKERS, limitmb=Config.WRITER_LIMIT_MB // Config.WORKERS,
+                           multisegment=True)
+        try:
+            for path in removed:
+                writer.delete_by_term('path', path)
+
+            # Файлы передаются в процессы небольшими пакетами, чтобы снизить накладные расходы
+            # на IPC. Размер пакета ограничен: результат пакета (до MAX_TEXT_LENGTH текста
+            # на документ) передается одним сообщением
+            chunksize = min(Config.INDEX_CHUNK_SIZE, Config.WORKER_MAX_FILES,
+                            max(1, total_files // (Config.WORKERS * 4)))
+
+            # Многопроцессная обработка файлов: извлечение текста упирается в GIL,
+            # поэтому потоки не дают выигрыша. Контекст 'spawn' безопасен для процесса с PyQt.
+            pool_options = {}
+            if sys.version_info >= (3, 11):
+                # Периодический перезапуск процессов полностью освобождает память,
+                # оставшуюся после pdfminer. max_tasks_per_child считает пакеты, а не файлы,
+                # поэтому порог в файлах пересчитывается в число пакетов
+                pool_options['max_tasks_per_child'] = Config.WORKER_MAX_FILES // chunksize
+            with ProcessPoolExecutor(
+                    max_workers=Config.WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    **pool_options
+            ) as executor:
+                files = FileIndexer._order_by_size(files, chunksize)
+                chunks = [files[i:i + chunksize] for i in range(0, total_files, chunksize)]
+                # В обработке одновременно находится ограниченное число пакетов, а готовые пакеты
+                # записываются в индекс в порядке завершения: память родительского процесса
+                # не растет с размером корпуса, даже если один из пакетов обрабатывается долго
+                max_in_flight = Config.WORKERS * Config.INDEX_CHUNKS_IN_FLIGHT
+                in_flight = {}
+                next_chunk = 0
+                while in_flight or next_chunk < len(chunks):
+                    while next_chunk < len(chunks) and len(in_flight) < max_in_flight:
+                        chunk = chunks[next_chunk]
+                        in_flight[executor.submit(process_chunk, chunk)] = chunk
+                        next_chunk += 1
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        chunk = in_flight.pop(future)
+                        for entry, doc in zip(chunk, future.result()):
+                            if doc:
+                                path, filename, content, last_modified = doc
+                                writer.update_document(
+                                    path=path,
+                                    filename=filename,
+                                    filename_ngrams=filename,
+                                    content=content,
+                                    last_modified=last_modified
+                                )
+                                # Текст документа освобождается сразу, не дожидаясь следующего результата
+                                doc = content = None
+                                indexed.append((path, entry.mtime, entry.size))
+                                success += 1
+                            else:
+                                failed += 1
+                            processed += 1
+                            if progress_callback:
+                                progress = int(processed / total_files * 100)
+                                progress_callback(progress)
+        except BaseException:
+            writer.cancel()
+            raise
+
+        # Сегменты не сливаются при коммите: слияние выполняется отдельно (FileIndexer.compact)
+        writer.commit(merge=False)
+        # Отметки сохраняются только после успешного коммита, чтобы не пропустить файлы при сбое
+        save_stamps(indexed, removed)
 
         print_success(f"Проиндексировано файлов: {success}")
         if failed:
             print_error(f"Ошибок при обработке файлов: {failed}")
 
-        # Оптимизация индекса при большом количестве документов
-        if len(files) > 10000:
-            ix.optimize()
-
         return success, failed
 
     @staticmethod
-    def _get_files_to_index(directory: Path) -> List[Path]:
+    def _order_by_size(files: List[FileEntry], chunksize: int) -> List[FileEntry]:
+        """
+        Упорядочивает файлы так, чтобы самые большие обрабатывались первыми, а небольшие
+        заполняли освободившиеся процессы в конце (планирование "сначала самые долгие").
+        Файлы, отсортированные по убыванию размера, раскладываются по пакетам по кругу:
+        иначе все крупные файлы попали бы в первый пакет и обрабатывались одним процессом.
+        Пакеты соответствуют последовательным срезам длины chunksize, которые передаются
+        процессам-обработчикам; последний пакет может быть короче.
+        """
+        if not files:
+            return files
+        ordered = sorted(files, key=lambda f: f.size, reverse=True)
+        chunks = -(-len(ordered) // chunksize)
+        capacity = [chunksize] * chunks
+        capacity[-1] = len(ordered) - chunksize * (chunks - 1)
+        buckets = [[] for _ in range(chunks)]
+        k = 0
+        for entry in ordered:
+            while len(buckets[k]) == capacity[k]:
+                k = (k + 1) % chunks
+            buckets[k].append(entry)
+            k = (k + 1) % chunks
+        return [entry for bucket in buckets for entry in bucket]
+
+    @staticmethod
+    def compact(index_dir: Path = Config.INDEX_DIR) -> None:
+        """
+        Сливает все сегменты индекса в один.
+        Полная перезапись индекса — дорогая операция, поэтому она не выполняется
+        при индексации, а запускается пользователем отдельно (в фоновом потоке).
+        """
+        ix = FileIndexer.get_index(index_dir)
+        ix.writer().commit(optimize=True)
+        print_success("Оптимизация индекса завершена")
+
+    @staticmethod
+    def _get_files_to_index(directory: Path) -> List[FileEntry]:
         """
         Рекурсивно собирает список файлов с поддерживаемыми расширениями для индексации.
         Фильтрует файлы по расширению и минимальному размеру.
+        Для абсолютной directory все возвращаемые пути также абсолютные.
         """
-        return [
-            f for f in directory.rglob('*')
-            if f.suffix.lower() in Config.SUPPORTED_EXTENSIONS
-               and f.stat().st_size >= Config.PDF_MIN_SIZE
-        ]
+        return list(FileIndexer._walk_files(directory))
+
+    @staticmethod
+    def _walk_files(directory: Path) -> Iterator[FileEntry]:
+        """
+        Обходит директорию через os.scandir и выдаёт подходящие файлы.
+        Расширение проверяется по имени записи, а размер и время изменения берутся
+        из одного вызова DirEntry.stat(), поэтому объекты Path создаются только
+        для отобранных файлов.
+        Недоступные директории пропускаются.
+        """
+        # Значения конфигурации читаются один раз, а не для каждой записи директории
+        extensions = _SUPPORTED_EXTENSIONS
+        min_size = Config.PDF_MIN_SIZE
+        stack = [str(directory)]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            elif (os.path.splitext(entry.name)[1].lower() in extensions
+                                  and entry.is_file()):
+                                st = entry.stat()
+                                if st.st_size >= min_size:
+                                    yield FileEntry(Path(entry.path), st.st_size, st.st_mtime)
+                        except OSError:
+                            continue
+            except OSError as e:
+                print_error(f"Не удалось прочитать директорию {current}: {e}")
 
     @staticmethod
     def _process_batch(writer: IndexWriter, batch: List[Path]) -> Tuple[int, int]:
@@ -192,12 +548,13 @@ class FileIndexer:
         """
         success = 0
         for file_path in batch:
-            text = FileIndexer._extract_text(file_path)
+            text = FileIndexer._extract_text(FileEntry.from_path(file_path))
             try:
                 print(f"Индексируем файл: {file_path.name}, тип: {type(file_path.name)}")
                 writer.add_document(
                     path=str(file_path.absolute()),
-                    filename=str(file_path.name.lower()),
+                    filename=file_path.name.casefold(),
+                    filename_ngrams=file_path.name.casefold(),
                     content=text,
                     last_modified=datetime.fromtimestamp(file_path.stat().st_mtime)
                 )
@@ -207,18 +564,37 @@ class FileIndexer:
         return success, len(batch)
 
     @staticmethod
-    def _extract_text(file_path: Path) -> Optional[str]:
+    def _extract_text(entry: FileEntry) -> Optional[str]:
         """
-        Определяет тип файла по расширению и вызывает соответствующий метод для извлечения текста.
+        Определяет тип файла по расширению и вызывает соответствующий метод из таблицы _EXTRACTORS.
         Поддерживаются PDF, DOCX и TXT.
+        Извлеченный текст предварительно нормализуется (нижний регистр, без пунктуации).
         Возвращает извлеченный текст или None, если формат не поддерживается.
         """
-        ext = file_path.suffix.lower()
-        if ext == '.pdf':
-            return FileIndexer.extract_pdf_text(file_path)
-        elif ext == '.docx':
-            return FileIndexer.extract_docx_text(file_path)
-        elif ext == '.txt':
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                return f.read(Config.MAX_TEXT_LENGTH)
-        return None
\ No newline at end of file
+        extractor = _EXTRACTORS.get(entry.path.suffix.lower())
+        if extractor is None:
+            return None
+        text = extractor(entry)
+        return normalize(text) if text else text
+
+    @staticmethod
+    def _extract_pdf_text_cached(entry: FileEntry) -> Optional[str]:
+        """
+        Извлекает текст из PDF с использованием дискового кэша.
+        Извлечение текста из PDF самое дорогое, поэтому результат сохраняется между запусками.
+        """
+        text = get_cached_text(entry.path, entry.size, entry.mtime)
+        if text is None:
+            text = FileIndexer.extract_pdf_text(entry.path, entry.size)
+            if text:
+                store_text(entry.path, entry.size, entry.mtime, text)
+        return text
+
+
+# Таблица выбора функции извлечения текста по расширению файла.
+# Для поддержки нового формата достаточно добавить сюда запись.
+_EXTRACTORS: Dict[str, Callable[[FileEntry], Optional[str]]] = {
+    '.pdf': FileIndexer._extract_pdf_text_cached,
+    '.docx': lambda entry: FileIndexer.extract_docx_text(entry.path),
+    '.txt': lambda entry: FileIndexer.extract_txt_text(entry.path),
+}
\ No newline at end of file
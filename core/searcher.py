@@ -1,13 +1,17 @@
 import logging
 import re
 import string
+import threading
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, time, date, timedelta
 from functools import lru_cache
-from typing import List
+from typing import List, Dict, Optional
 
 from whoosh.analysis import StandardAnalyzer
 from whoosh.qparser import QueryParser, FuzzyTermPlugin, OrGroup
-from whoosh.query import Term, And, Or, DateRange, FuzzyTerm, Wildcard
+from whoosh.query import Term, And, Or, DateRange, FuzzyTerm
 from nltk import word_tokenize
 from nltk.corpus import wordnet as wn
 from natasha import Segmenter, NewsEmbedding, NewsMorphTagger, MorphVocab, Doc
@@ -16,80 +20,398 @@ from razdel import tokenize
 
 from config import Config
 from models.schemas import SearchResult
+from .synonym_cache import get_cached_synonyms, store_synonyms, most_frequent_synonyms
 from .utils import print_error
 
 # Логирование для отладки и мониторинга
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-# Инициализация инструментов для русского языка (Natasha, ru_synonyms)
-segmenter = Segmenter()
-emb = NewsEmbedding()
-morph_tagger = NewsMorphTagger(emb)
-morph_vocab = MorphVocab()
-sg = SynonymsGraph()
+# Инструменты для русского языка (Natasha, ru_synonyms) загружаются при первом использовании:
+# одни только веса NewsEmbedding занимают около 100 МБ, а поиск по дате и имени файла
+# в них не нуждается. WordNet из nltk и так загружается лениво (LazyCorpusLoader)
+_natasha = None
+_synonyms_graph = None
+_NLP_LOCK = threading.Lock()
+
+# Скомпилированный шаблон для определения языка слова: одна проверка на уровне C,
+# язык определяется по имени совпавшей группы (m.lastgroup).
+# Диапазоны регистров заданы явно: с re.IGNORECASE [a-z] совпадал бы и с некоторыми
+# не-латинскими символами (например, знаком Кельвина).
+_LANG_RE = re.compile(r'(?P<ru>[а-яёА-ЯЁ-]+)|(?P<en>[a-zA-Z-]+)')
+# Шаблоны отдельных языков: когда язык ясен по первому символу, слово проверяется только одним
+_RU_RE = re.compile(r'[а-яёА-ЯЁ-]+')
+_EN_RE = re.compile(r'[a-zA-Z-]+')
+
+# Знаки препинания: множество для проверки за O(1) и таблица замены на пробел перед токенизацией.
+# Дефис сохраняется, чтобы не разбивать составные слова ("кто-то", "e-mail").
+_PUNCT = frozenset(string.punctuation)
+_PUNCT_TABLE = str.maketrans({c: ' ' for c in string.punctuation if c != '-'})
+# Слово для быстрой токенизации запроса: буквы, цифры и дефис
+_WORD_RE = re.compile(r'[\w-]+')
+
+# Анализатор запроса по имени файла не имеет состояния и создаётся один раз
+_FILENAME_ANALYZER = StandardAnalyzer()
+# Кэш парсеров: id(schema) -> parser. Значения хранятся по слабым ссылкам: запись удаляется,
+# когда парсер больше нигде не используется, и кэш не удерживает старые схемы.
+# Схема парсера (parser.schema) сверяется, чтобы id не был переиспользован другим объектом
+_PARSER_CACHE = weakref.WeakValueDictionary()
+# Кэш построенных текстовых запросов: parser -> {строка запроса: Query}.
+# Ключи хранятся по слабым ссылкам, поэтому кэш удаляется вместе с парсером
+_QUERY_CACHE = weakref.WeakKeyDictionary()
+
+# Слова, для которых синонимы не найдены: множество для проверки за O(1)
+# и очередь FIFO для вытеснения самых старых записей при переполнении
+_NEG_CACHE = set()
+_NEG_CACHE_ORDER = deque()
+_NEG_CACHE_LOCK = threading.Lock()
+
+# Кэш синонимов в памяти (слово -> список синонимов). Словарь синонимов за сеанс
+# небольшой и стабильный, поэтому вытеснение LRU не нужно: обычный dict быстрее
+_SYN_CACHE = Config.SYNONYM_CACHE
+# Кэш синонимов наборов слов запроса: tuple(words) -> {слово: синонимы}
+_BATCH_CACHE = {}
+
+# Относительные даты для поиска по времени: ключевое слово -> сколько дней назад
+_RELATIVE_DAYS = {'сегодня': 0, 'вчера': 1}
+
+# Общий пул потоков для получения синонимов слов длинных запросов
+_SYN_POOL = ThreadPoolExecutor(max_workers=Config.SYNONYM_THREADS)
+
+def _get_natasha():
+    """
+    Возвращает (segmenter, morph_tagger, morph_vocab) Natasha, загружая модели при первом вызове.
+    """
+    global _natasha
+    if _natasha is None:
+        with _NLP_LOCK:
+            if _natasha is None:
+                _natasha = (Segmenter(), NewsMorphTagger(NewsEmbedding()), MorphVocab())
+    return _natasha
+
+def _get_synonyms_graph() -> SynonymsGraph:
+    """
+    Возвращает граф синонимов ru_synonyms, загружая его при первом вызове.
+    """
+    global _synonyms_graph
+    if _synonyms_graph is None:
+        with _NLP_LOCK:
+            if _synonyms_graph is None:
+                _synonyms_graph = SynonymsGraph()
+    return _synonyms_graph
+
+def warm_up_nlp():
+    """
+    Загружает модели для русского языка и синонимы частых слов из дискового кэша
+    в фоновом потоке, чтобы первый запрос не ждал их загрузки.
+    Вызывается при старте приложения, параллельно с открытием индекса
+    (а не при импорте модуля, который выполняют и процессы индексации).
+    """
+    def load():
+        _preload_synonyms()
+        _get_natasha()
+        _get_synonyms_graph()
+    threading.Thread(target=load, daemon=True).start()
 
 def lemmatize_ru(word):
     """
     Лемматизация слова на русском языке с помощью Natasha.
+    Обёртка над lemmatize_ru_batch для одного слова.
     Возвращает лемму слова, если возможно, иначе исходное слово.
     """
-    doc = Doc(word)
+    lemmas = lemmatize_ru_batch([word])
+    return lemmas[0] if lemmas else word
+
+def lemmatize_ru_batch(words: List[str]) -> List[str]:
+    """
+    Лемматизация списка русских слов одним вызовом Natasha.
+    Слова объединяются в один документ, поэтому сегментация и морфологический
+    разбор выполняются один раз, а не для каждого слова отдельно.
+    Возвращает список лемм в порядке токенов.
+    """
+    segmenter, morph_tagger, morph_vocab = _get_natasha()
+    doc = Doc(" ".join(words))
     doc.segment(segmenter)
     doc.tag_morph(morph_tagger)
     for token in doc.tokens:
         token.lemmatize(morph_vocab)
-    if doc.tokens:
-        return doc.tokens[0].lemma
-    return word
+    return [token.lemma for token in doc.tokens]
 
 def detect_language(word: str) -> str:
     """
     Определяет язык слова: 'ru' для русского, 'en' для английского, иначе 'unknown'.
+    Язык предполагается по первому символу, а шаблон только подтверждает, что слово
+    целиком написано в одном алфавите. Общий шаблон нужен лишь для слов, начинающихся с дефиса.
     """
-    if re.fullmatch(r'[а-яёА-ЯЁ-]+', word):
-        return 'ru'
-    elif re.fullmatch(r'[a-zA-Z-]+', word):
-        return 'en'
+    if not word:
+        return 'unknown'
+    c = word[0]
+    if 'а' <= c <= 'я' or 'А' <= c <= 'Я' or c == 'ё' or c == 'Ё':
+        return 'ru' if _RU_RE.fullmatch(word) else 'unknown'
+    if 'a' <= c <= 'z' or 'A' <= c <= 'Z':
+        return 'en' if _EN_RE.fullmatch(word) else 'unknown'
+    if c == '-':
+        m = _LANG_RE.fullmatch(word)
+        return m.lastgroup if m else 'unknown'
     return 'unknown'
 
-@lru_cache(maxsize=Config.MAX_CACHE_SIZE)
+def _is_known_miss(word: str) -> bool:
+    """
+    Проверяет, что у слова заведомо нет синонимов: число или ранее найденный промах.
+    """
+    return word.isdigit() or word in _NEG_CACHE
+
+def _remember_miss(word: str):
+    """
+    Запоминает слово без синонимов; при переполнении вытесняется самое старое.
+    Промахом считается только результат, равный [word]: для русских слов результат
+    [лемма] несет лемму, которую нельзя подменять исходным словом.
+    """
+    with _NEG_CACHE_LOCK:
+        if word in _NEG_CACHE:
+            return
+        _NEG_CACHE.add(word)
+        _NEG_CACHE_ORDER.append(word)
+        if len(_NEG_CACHE_ORDER) > Config.SYNONYM_MISS_CACHE_SIZE:
+            _NEG_CACHE.discard(_NEG_CACHE_ORDER.popleft())
+
 def get_synonyms(word: str) -> List:
     """Получает список синонимов для слова (русский и английский).
     Для русского использует Natasha и ru_synonyms, для английского - WordNet.
-    Результат кэшируется для ускорения повторных запросов."""
+    Результат кэшируется в два уровня: словарь в памяти и дисковый кэш,
+    который сохраняется между запусками программы.
+    Числа и слова, для которых синонимы ранее не нашлись, возвращаются сразу."""
+    synonyms = _SYN_CACHE.get(word)
+    if synonyms is not None:
+        return synonyms
     lang = detect_language(word)
+    synonyms = _stored_synonyms(word, lang)
+    if synonyms is None:
+        synonyms = _compute_and_store(word, lang)
+    return synonyms
 
+def _memoize(word: str, synonyms: List) -> List:
+    """
+    Сохраняет синонимы слова в кэше в памяти и запоминает промах, если синонимов нет.
+    """
+    if synonyms == [word]:
+        _remember_miss(word)
+    if len(_SYN_CACHE) >= Config.SYNONYM_CACHE_LIMIT:
+        # Защита от неограниченного роста при очень длинных сеансах
+        _SYN_CACHE.clear()
+    _SYN_CACHE[word] = synonyms
+    return synonyms
+
+def _stored_synonyms(word: str, lang: str) -> Optional[List]:
+    """
+    Возвращает синонимы известного промаха или из дискового кэша (с сохранением в памяти).
+    Если слово еще не обрабатывалось, возвращает None.
+    """
+    if _is_known_miss(word):
+        return [word]
+    synonyms = get_cached_synonyms(lang, word.lower())
+    if synonyms is not None:
+        _memoize(word, synonyms)
+    return synonyms
+
+def _compute_and_store(word: str, lang: str) -> List:
+    """
+    Вычисляет синонимы слова и сохраняет их в дисковом кэше и в памяти.
+    """
+    synonyms = _compute_synonyms(word, lang)
+    store_synonyms(lang, word.lower(), synonyms)
+    return _memoize(word, synonyms)
+
+# Прежнее публичное имя: псевдоним без обёртки, поиск идёт через один кэш get_synonyms
+get_cache_synonyms = get_synonyms
+
+def _compute_synonyms(word: str, lang: str) -> List:
+    """
+    Вычисляет синонимы слова без кэширования.
+    """
     if lang == 'ru':
-        lemma = lemmatize_ru(word)
-        if sg.is_in_dictionary(lemma):
-            synonyms = list(sg.get_list(lemma))
-            return synonyms if synonyms else [lemma]
-        else:
-            return [lemma]
+        return get_synonyms_by_lemma(lemmatize_ru(word), lang)
     elif lang == 'en':
-        synonyms = set()
-        for syn in wn.synsets(word):
-            for lemma in syn.lemmas():
-                synonyms.add(lemma.name().replace('_', ' '))
+        # replace вызывается только для составных имён, чтобы не создавать копии строк
+        synonyms = {
+            name.replace('_', ' ') if '_' in name else name
+            for syn in wn.synsets(word)
+            for name in syn.lemma_names()
+        }
         return list(synonyms) if synonyms else [word]
     else:
         return [word]
 
 @lru_cache(maxsize=Config.MAX_CACHE_SIZE)
-def get_cache_synonyms(word):
+def get_synonyms_by_lemma(lemma: str, lang: str) -> List:
+    """
+    Получает список синонимов для уже лемматизированного слова.
+    Для русского ищет лемму в ru_synonyms без повторной лемматизации,
+    для остальных языков делегирует get_synonyms.
+    """
+    if lang == 'ru':
+        sg = _get_synonyms_graph()
+        if sg.is_in_dictionary(lemma):
+            synonyms = list(sg.get_list(lemma))
+            return synonyms if synonyms else [lemma]
+        return [lemma]
+    return get_synonyms(lemma)
+
+def get_synonyms_batch(words: List[str]) -> Dict[str, List]:
+    """
+    Получает синонимы всех слов запроса за один этап.
+    Слова, уже известные кэшу в памяти или дисковому кэшу (включая промахи), берутся оттуда.
+    Остальные русские слова лемматизируются одним общим вызовом Natasha, после чего леммы
+    ищутся в ru_synonyms одним проходом; если разбиение на токены не совпало
+    со словами, используется пословный путь. Найденные синонимы сохраняются в обоих кэшах.
+    Оставшиеся слова длинных запросов обрабатываются параллельно в общем пуле потоков.
+    Результат (слово -> синонимы) кэшируется для всего набора слов.
+    """
+    key = tuple(words)
+    cached = _BATCH_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    results = {}
+    pending = {}  # слово -> язык для слов, которых нет ни в одном кэше
+    for word in dict.fromkeys(words):
+        synonyms = _SYN_CACHE.get(word)
+        if synonyms is None:
+            lang = detect_language(word)
+            synonyms = _stored_synonyms(word, lang)
+            if synonyms is None:
+                pending[word] = lang
+                continue
+        results[word] = synonyms
+
+    ru_words = [w for w, lang in pending.items() if lang == 'ru']
+    if len(ru_words) > 1:
+        lemmas = lemmatize_ru_batch(ru_words)
+        if len(lemmas) == len(ru_words):
+            for word, lemma in zip(ru_words, lemmas):
+                results[word] = _lemma_synonyms(word, lemma)
+
+    rest = [w for w in pending if w not in results]
+    langs = [pending[w] for w in rest]
+    if len(rest) >= Config.SYNONYM_PARALLEL_MIN_WORDS:
+        results.update(zip(rest, _SYN_POOL.map(_compute_and_store, rest, langs)))
+    else:
+        for word, lang in zip(rest, langs):
+            results[word] = _compute_and_store(word, lang)
+
+    if len(_BATCH_CACHE) >= Config.MAX_CACHE_SIZE:
+        _BATCH_CACHE.clear()
+    _BATCH_CACHE[key] = results
+    return results
+
+def _lemma_synonyms(word: str, lemma: str) -> List:
     """
-    Кэшированный вызов функции получения синонимов для слова.
+    Получает синонимы русского слова запроса по уже найденной лемме
+    и сохраняет их в дисковом кэше и в памяти.
     """
-    return get_synonyms(word)
+    synonyms = get_synonyms_by_lemma(lemma, 'ru')
+    store_synonyms('ru', word.lower(), synonyms)
+    return _memoize(word, synonyms)
+
+def _query_terms(query_str: str, schema) -> Dict[str, List[str]]:
+    """
+    Разбивает запрос на слова и приводит каждое анализатором поля content к терминам индекса.
+    Стоп-слова отбрасывает анализатор (как и при индексации):
+    слова, из которых анализатор не получил ни одного термина, пропускаются.
+    Повторяющиеся слова учитываются один раз, а число слов ограничено
+    Config.MAX_QUERY_TERMS, чтобы дерево запроса не разрасталось.
+    Возвращает словарь слово -> термины в порядке слов запроса.
+    """
+    content_field = schema["content"]
+    tokens = fast_tokenize(query_str)
+
+    terms_by_word = {}
+    for w in tokens:
+        if w in terms_by_word or w in _PUNCT:
+            continue
+        terms = list(content_field.process_text(w, mode='query'))
+        if terms:
+            terms_by_word[w] = terms
+            if len(terms_by_word) >= Config.MAX_QUERY_TERMS:
+                break
+    return terms_by_word
+
+def _synonym_queries(terms_by_word: Dict[str, List[str]], synonyms_by_word: Dict[str, List], content_field) -> List[Or]:
+    """
+    Строит для каждого слова запроса подзапрос Or: термины самого слова с повышенным
+    весом и его синонимы с обычным весом.
+    Синонимы приводятся анализатором поля content к терминам индекса (стемминг, стоп-слова);
+    составной синоним ("written report") ищется как And своих терминов.
+    Синонимы слова, которого нет в synonyms_by_word, получаются через get_synonyms.
+    Один такой запрос находит и точные совпадения, и совпадения по синонимам,
+    ранжируя точные выше, поэтому второй проход поиска не нужен.
+    """
+    synonym_queries = []
+    for word, terms in terms_by_word.items():
+        term_queries = [Term("content", text, boost=2.0) for text in terms]
+        seen = {(text,) for text in terms}
+        synonyms = synonyms_by_word.get(word)
+        if synonyms is None:
+            synonyms = get_synonyms(word)
+        for syn in synonyms[:Config.MAX_SYNONYMS]:
+            syn_terms = tuple(content_field.process_text(syn, mode='query'))
+            if not syn_terms or syn_terms in seen:
+                continue
+            seen.add(syn_terms)
+            if len(syn_terms) == 1:
+                term_queries.append(Term("content", syn_terms[0]))
+            else:
+                term_queries.append(And([Term("content", text) for text in syn_terms]))
+        synonym_queries.append(Or(term_queries))
+    return synonym_queries
+
+def _text_query(parser, query_str: str, synonyms_by_word: Optional[Dict[str, List]] = None,
+                terms_by_word: Optional[Dict[str, List[str]]] = None):
+    """
+    Возвращает запрос Whoosh по тексту: And подзапросов по словам и синонимам,
+    а если слов не осталось - результат разбора парсером.
+    Готовые синонимы и термины слов запроса можно передать в synonyms_by_word
+    и terms_by_word (см. batch_search).
+    Построенные запросы кэшируются для каждого парсера: повторный запрос
+    (например, при повторном поиске из интерфейса) не лемматизируется и не разбирается заново.
+    """
+    cache = _QUERY_CACHE.get(parser)
+    if cache is None:
+        cache = _QUERY_CACHE[parser] = {}
+    query = cache.get(query_str)
+    if query is None:
+        if terms_by_word is None:
+            terms_by_word = _query_terms(query_str, parser.schema)
+        if synonyms_by_word is None:
+            synonyms_by_word = get_synonyms_batch(list(terms_by_word))
+        synonym_queries = _synonym_queries(terms_by_word, synonyms_by_word, parser.schema["content"])
+        query = And(synonym_queries) if synonym_queries else parser.parse(query_str)
+        if len(cache) >= Config.QUERY_CACHE_SIZE:
+            cache.clear()
+        cache[query_str] = query
+    return query
+
+def _preload_synonyms():
+    """
+    Загружает в кэш в памяти синонимы самых часто запрашиваемых слов из дискового кэша.
+    Слова, уже попавшие в кэш за время загрузки, не перезаписываются.
+    """
+    for word, synonyms in most_frequent_synonyms(Config.SYNONYM_PRELOAD_SIZE):
+        if word not in _SYN_CACHE:
+            _memoize(word, synonyms)
 
 def setup_search_parser(schema):
     """
     Создаёт и настраивает парсер Whoosh для поиска по содержимому.
     Добавляет поддержку нечеткого поиска (FuzzyTerm).
+    Парсер для одной и той же схемы создаётся один раз и переиспользуется.
     """
+    parser = _PARSER_CACHE.get(id(schema))
+    if parser is not None and parser.schema is schema:
+        return parser
     parser = QueryParser("content", schema, group=OrGroup)
     parser.add_plugin(FuzzyTermPlugin())
+    _PARSER_CACHE[id(schema)] = parser
     return parser
 
 def tokenize_ru(text: str) -> List[str]:
@@ -103,7 +425,10 @@ def tokenize_text(text: str, lang: str) -> List[str]:
     """
     Токенизация текста в зависимости от языка.
     Для русского - razdel, для английского - nltk.word_tokenize.
+    Знаки препинания (кроме дефиса) заменяются пробелами до токенизации,
+    поэтому токены-знаки препинания не образуются.
     """
+    text = text.translate(_PUNCT_TABLE)
     if lang == 'ru':
         # Для русского используем Natasha
         return [token.lower() for token in tokenize_ru(text)]
@@ -111,228 +436,184 @@ def tokenize_text(text: str, lang: str) -> List[str]:
         # Для английского используем nltk.word_tokenize
         return [token.lower() for token in word_tokenize(text)]
 
-def search_index(searcher, parser, query_str: str, limit: int = 10, stop_words=None) -> List[SearchResult]:
+def _hits_to_results(hits) -> List[SearchResult]:
     """
-    Поиск документов по запросу с поддержкой синонимов.
-    Сначала выполняет прямой поиск, затем - расширенный с синонимами.
+    Преобразует результаты поиска Whoosh в список SearchResult (путь, оценка, дата изменения).
+    Общий построитель результатов для всех видов поиска по содержимому и дате.
+    """
+    results = []
+    for hit in hits:
+        fields = hit.fields()
+        results.append(SearchResult(fields['path'], hit.score, fields.get('last_modified')))
+    return results
+
+def _hits_to_results_with_filename(hits) -> List[SearchResult]:
+    """
+    Вариант _hits_to_results для поиска по имени файла: добавляет имя файла.
+    """
+    results = []
+    for hit in hits:
+        fields = hit.fields()
+        results.append(SearchResult(
+            fields['path'], hit.score, fields.get('last_modified'), fields['filename']
+        ))
+    return results
+
+def fast_tokenize(text: str) -> List[str]:
+    """
+    Быстрая токенизация запроса регулярным выражением (без razdel и nltk).
+    Для поиска синонимов достаточно разбиения на слова в нижнем регистре,
+    поэтому различие русского и английского здесь не нужно.
+    Для разбиения с учетом языка используется tokenize_text.
     """
-    if stop_words is None:
-        stop_words = set()
+    return _WORD_RE.findall(text.lower())
 
-    # Прямой поиск
+def search_index(searcher, parser, query_str: str, limit: int = 10) -> List[SearchResult]:
+    """
+    Поиск документов по запросу с поддержкой синонимов.
+    Выполняет один поиск: исходные слова запроса с повышенным весом объединяются
+    с их синонимами. Если после токенизации слов не осталось, запрос разбирается парсером.
+    """
     try:
-        query = parser.parse(query_str)
-        results = searcher.search(query, limit=limit)
-        if results:
-            return [{
-                'path': hit['path'],
-                'score': hit.score,
-                'last_modified': hit.get('last_modified')
-            } for hit in results]
+        query = _text_query(parser, query_str)
+        results = searcher.search(query, limit=limit, terms=False, scored=True)
+        return _hits_to_results(results)
     except Exception as e:
-        print_error(f"Ошибка при прямом поиске: {e}")
+        print_error(f"Ошибка при поиске: {e}")
         return []
 
-    # Поиск с синонимами
+def batch_search(searcher, parser, queries: List[str], limit: int = 10) -> List[List[SearchResult]]:
+    """
+    Выполняет несколько поисковых запросов за один проход подготовки.
+    Одинаковые запросы выполняются один раз; слова всех ещё не построенных запросов
+    лемматизируются и расширяются синонимами одним вызовом get_synonyms_batch,
+    после чего каждый запрос ищется тем же способом, что и в search_index.
+    Если общая подготовка завершилась ошибкой, каждый запрос строится отдельно,
+    и ошибка в одном слове не прерывает остальные запросы.
+    Возвращает списки результатов в порядке переданных запросов.
+    """
+    unique_queries = list(dict.fromkeys(queries))
+    cache = _QUERY_CACHE.get(parser, {})
+    terms = {}
+    synonyms_by_word = {}
     try:
-        lang = detect_language(query_str)
-        tokens = tokenize_text(query_str, lang)
-
-        words = [
-            w.lower()
-            for w in tokens
-            if w not in stop_words and w not in string.punctuation
-        ]
-        synonym_queries = []
-        for word in words:
-            synonyms = get_cache_synonyms(word)
-            if synonyms:
-                term_queries = [Term("content", syn) for syn in synonyms[:Config.MAX_SYNONYMS]]
-                synonym_queries.append(Or(term_queries))
-        if synonym_queries:
-            combined_query = And(synonym_queries)
-            results = searcher.search(combined_query, limit=limit)
-            return [{
-                'path': hit['path'],
-                'score': hit.score,
-                'last_modified': hit.get('last_modified')
-            } for hit in results]
-        return []
+        terms = {q: _query_terms(q, parser.schema) for q in unique_queries if q not in cache}
+        words = list(dict.fromkeys(w for terms_by_word in terms.values() for w in terms_by_word))
+        synonyms_by_word = get_synonyms_batch(words)
     except Exception as e:
-        print_error(f"Ошибка при поиске с синонимами: {e}")
-        return []
+        print_error(f"Ошибка при подготовке запросов: {e}")
+
+    found = {}
+    for query_str in unique_queries:
+        try:
+            # Запрос, вытесненный из кэша во время цикла, строится заново:
+            # его термины и синонимы при необходимости вычисляются в _text_query
+            query = _text_query(parser, query_str, synonyms_by_word, terms.get(query_str))
+            results = searcher.search(query, limit=limit, terms=False, scored=True)
+            found[query_str] = _hits_to_results(results)
+        except Exception as e:
+            print_error(f"Ошибка при поиске '{query_str}': {e}")
+            found[query_str] = []
+    return [found[q] for q in queries]
+
+def _parse_date(date_str: str) -> Optional[date]:
+    """
+    Разбирает дату: ключевые слова 'сегодня' и 'вчера' или формат YYYY-MM-DD.
+    Возвращает None для пустой строки; при неверном формате выбрасывает ValueError.
+    """
+    if not date_str:
+        return None
+    days_ago = _RELATIVE_DAYS.get(date_str.lower())
+    if days_ago is not None:
+        return date.today() - timedelta(days=days_ago)
+    return date.fromisoformat(date_str)
 
 def search_time_range(searcher, start_date_str: str, end_date_str: str, limit: int = 10) -> List[SearchResult]:
     """
     Поиск документов по временному диапазону (дата изменения).
     Поддерживает ключевые слова 'сегодня' и 'вчера', а также формат YYYY-MM-DD.
+    Если задана только одна граница, вторая берется от 1970-01-01 или до сегодняшнего дня.
     """
-    start_date = None
-    end_date = None
     try:
-        # Обработка относительных дат и строковых дат
-        if start_date_str and start_date_str.lower() == 'сегодня':
-            start_date = date.today()
-        elif start_date_str and start_date_str.lower() == 'вчера':
-            start_date = date.today() - timedelta(days=1)
-        elif start_date_str:
-            start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
-
-        if end_date_str and end_date_str.lower() == 'сегодня':
-            end_date = date.today()
-        elif end_date_str and end_date_str.lower() == 'вчера':
-            end_date = date.today() - timedelta(days=1)
-        elif end_date_str:
-            end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
-
-        results = []
-        if start_date and end_date:
-            start_datetime = datetime.combine(start_date, datetime.min.time())
-            end_datetime = datetime.combine(end_date, datetime.max.time())
-
-            date_query = DateRange("last_modified", start_datetime, end_datetime)
-            hits = searcher.search(date_query, limit=limit)
-            for hit in hits:
-                results.append({
-                    'path': hit['path'],
-                    'score': hit.score,
-                    'last_modified': hit['last_modified']
-                })
-        elif start_date:
-            start_datetime = datetime.combine(start_date, datetime.min.time())
-            date_query = DateRange("last_modified", start_datetime, datetime.combine(date.today(), datetime.max.time()))
-            hits = searcher.search(date_query, limit=limit)
-            for hit in hits:
-                results.append({
-                    'path': hit['path'],
-                    'score': hit.score,
-                    'last_modified': hit['last_modified']
-                })
-        elif end_date:
-            end_datetime = datetime.combine(end_date, datetime.max.time())
-            date_query = DateRange("last_modified", datetime.combine(date(1970, 1, 1), datetime.min.time()),
-                                   end_datetime)
-            hits = searcher.search(date_query, limit=limit)
-            for hit in hits:
-                results.append({
-                    'path': hit['path'],
-                    'score': hit.score,
-                    'last_modified': hit['last_modified']
-                })
-
+        start_date = _parse_date(start_date_str)
+        end_date = _parse_date(end_date_str)
     except ValueError:
         print_error("Неверный формат даты. Используйте YYYY-MM-DD или 'сегодня'/'вчера'.")
         return []
-    return results
 
-def combined_search(searcher, parser, params: dict, stop_words=None) -> List[SearchResult]:
+    if not start_date and not end_date:
+        return []
+    date_query = DateRange(
+        "last_modified",
+        datetime.combine(start_date or date(1970, 1, 1), time.min),
+        datetime.combine(end_date or date.today(), time.max)
+    )
+    hits = searcher.search(date_query, limit=limit, terms=False, scored=True)
+    return _hits_to_results(hits)
+
+def combined_search(searcher, parser, params: dict) -> List[SearchResult]:
     """
     Комбинированный поиск: по словам (с синонимами) и по временному диапазону.
-    Сначала ищет точное совпадение, затем с учетом синонимов.
+    Как и search_index, выполняет один поиск по исходным словам и их синонимам.
     """
-    if stop_words is None:
-        stop_words = set()
-
     try:
-        start_dt = datetime.strptime(params['start_date'], "%Y-%m-%d").date()
-        end_dt = datetime.strptime(params['end_date'], "%Y-%m-%d").date()
-        text_query = parser.parse(params['query'])
+        start_dt = date.fromisoformat(params['start_date'])
+        end_dt = date.fromisoformat(params['end_date'])
+        text_query = _text_query(parser, params['query'])
         date_query = DateRange(
             "last_modified",
             datetime.combine(start_dt, time.min),
             datetime.combine(end_dt, time.max)
         )
 
-        # Прямой поиск
         combined_query = And([text_query, date_query])
-        results = searcher.search(combined_query, limit=params.get('limit', 10))
-        if results:
-            return [{
-                'path': hit['path'],
-                'score': hit.score,
-                'last_modified': hit.get('last_modified')
-            } for hit in results]
-
-        # Поиск с синонимами
-        lang = detect_language(params['query'])
-        tokens = tokenize_text(params['query'], lang)
-
-        words = [
-            w.lower()
-            for w in tokens
-            if w not in stop_words and w not in string.punctuation
-        ]
-        synonym_queries = []
-        for word in words:
-            synonyms = get_cache_synonyms(word)
-            if synonyms:
-                term_queries = [Term("content", syn) for syn in synonyms[:Config.MAX_SYNONYMS]]
-                synonym_queries.append(Or(term_queries))
-        if synonym_queries:
-            text_query_synonyms = And(synonym_queries)
-            combined_query_synonyms = And([text_query_synonyms, date_query])
-            results = searcher.search(combined_query_synonyms, limit=params.get('limit', 10))
-            return [{
-                'path': hit['path'],
-                'score': hit.score,
-                'last_modified': hit.get('last_modified')
-            } for hit in results]
-        else:
-            return []
+        results = searcher.search(combined_query, limit=params.get('limit', 10), terms=False, scored=True)
+        return _hits_to_results(results)
     except Exception as e:
         print_error(f"Ошибка в combined_search: {e}")
         return []
 
-def _normalize_filename(filename):
+def _fuzzy_maxdist(part: str) -> int:
     """
-    Приводит имя файла к строке в нижнем регистре для сравнения.
-    Поддерживает bytes, str, int.
+    Допустимое число правок для нечеткого поиска части имени файла:
+    для частей до 3 символов 0 (любая правка дает посторонние имена), до 6 символов 1, иначе 2.
     """
-    if isinstance(filename, bytes):
-        try:
-            return filename.decode('utf-8').lower()
-        except UnicodeDecodeError:
-            return None
-    elif isinstance(filename, str):
-        return filename.lower()
-    elif isinstance(filename, int):
-        return str(filename).lower()
-    else:
-        return None
+    if len(part) <= 3:
+        return 0
+    return 1 if len(part) <= 6 else 2
 
 def search_by_filename(searcher, filename: str) -> List[SearchResult]:
     """
-    Поиск документов по имени файла с поддержкой нечеткого и wildcard поиска.
-    Корректно работает с разными типами данных в поле filename.
+    Поиск документов по имени файла с поддержкой нечеткого поиска и поиска по подстроке.
+    Подстрока ищется по n-граммам имени (поле filename_ngrams): анализатор поля
+    разбивает часть запроса на n-граммы, и каждая ищется как термин (Term).
+    Нечеткий поиск (FuzzyTerm) добавлен с пониженным весом для устойчивости к опечаткам;
+    допустимое расстояние растет с длиной части, а для коротких частей нечеткий поиск не выполняется.
+    Если в запросе не осталось частей (анализатор отбрасывает стоп-слова и одиночные символы),
+    возвращается пустой список.
+    Все ограничения выражены в самом запросе, поэтому результаты Whoosh
+    не фильтруются повторно в Python.
     """
-    filename_query = filename.lower().strip()
+    filename_query = filename.casefold().strip()
 
-    analyzer = StandardAnalyzer()
-    query_parts = [part.text for part in analyzer(filename_query)] # Упрощенный список частей запроса
+    query_parts = [part.text for part in _FILENAME_ANALYZER(filename_query)] # Упрощенный список частей запроса
+    if not query_parts:
+        return []
 
+    ngram_field = searcher.schema["filename_ngrams"]
     queries = []
     for part in query_parts:
-        wildcard_query = Wildcard("filename", f"*{part}*")
-        fuzzy_query = FuzzyTerm("filename", part, maxdist=2)
-        queries.append(Or([wildcard_query, fuzzy_query]))
+        grams = ngram_field.process_text(part, mode='query')
+        subqueries = [And([Term("filename_ngrams", gram) for gram in grams])]
+        maxdist = _fuzzy_maxdist(part)
+        if maxdist:
+            subqueries.append(FuzzyTerm("filename", part, boost=0.5, maxdist=maxdist))
+        queries.append(Or(subqueries))
 
     if len(queries) > 1:
         query = And(queries)
     else:
         query = queries[0]
 
-    results = searcher.search(query, limit=Config.FILE_SEARCH_LIMIT)
-
-    matched_docs = []
-    for hit in results:
-        doc_filename = hit['filename']
-        doc_str = _normalize_filename(doc_filename)
-
-        if doc_str and (doc_str.startswith(filename_query) or filename_query in doc_str):
-            matched_docs.append({
-                'path': hit['path'],
-                'filename': doc_str,
-                'last_modified': hit['last_modified'],
-                'score': hit.score
-            })
-    return matched_docs
\ No newline at end of file
+    results = searcher.search(query, limit=Config.FILE_SEARCH_LIMIT, terms=False, scored=True)
+    return _hits_to_results_with_filename(results)
\ No newline at end of file
@@ -0,0 +1,51 @@
+import sqlite3
+from contextlib import closing
+from typing import Dict, Iterable, Tuple
+
+from config import Config
+
+# Отметка файла: (время изменения, размер) на момент последней успешной индексации
+Stamp = Tuple[float, int]
+
+
+def _connect() -> sqlite3.Connection:
+    """
+    Открывает базу отметок проиндексированных файлов и создаёт таблицу при необходимости.
+    Режим WAL позволяет читать базу одновременно с записью.
+    """
+    Config.INDEX_DIR.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(Config.STAMPS_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS stamps ("
+        "path TEXT PRIMARY KEY, mtime REAL, size INTEGER)"
+    )
+    return conn
+
+
+def load_stamps() -> Dict[str, Stamp]:
+    """Возвращает отметки всех проиндексированных файлов: путь -> (mtime, size)."""
+    with closing(_connect()) as conn:
+        return {
+            path: (mtime, size)
+            for path, mtime, size in conn.execute("SELECT path, mtime, size FROM stamps")
+        }
+
+
+def save_stamps(stamps: Iterable[Tuple[str, float, int]], removed: Iterable[str] = ()) -> None:
+    """
+    Сохраняет отметки (path, mtime, size) проиндексированных файлов одной транзакцией
+    и удаляет отметки файлов, убранных из индекса.
+    """
+    with closing(_connect()) as conn, conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO stamps (path, mtime, size) VALUES (?, ?, ?)",
+            stamps
+        )
+        conn.executemany("DELETE FROM stamps WHERE path=?", ((p,) for p in removed))
+
+
+def clear_stamps() -> None:
+    """Удаляет все отметки (например, при создании нового пустого индекса)."""
+    with closing(_connect()) as conn, conn:
+        conn.execute("DELETE FROM stamps")
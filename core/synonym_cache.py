@@ -0,0 +1,80 @@
+import json
+import sqlite3
+import threading
+from typing import List, Optional, Tuple
+
+from config import Config
+from .utils import print_error
+
+# Соединение используется из нескольких потоков (поиск, предзагрузка), поэтому доступ под блокировкой
+_connection: Optional[sqlite3.Connection] = None
+_lock = threading.Lock()
+
+
+def _get_connection() -> sqlite3.Connection:
+    """
+    Открывает (при первом обращении) дисковый кэш синонимов.
+    Хранит для каждой пары (язык, слово) список синонимов и число обращений.
+    """
+    global _connection
+    if _connection is None:
+        Config.INDEX_DIR.mkdir(parents=True, exist_ok=True)
+        _connection = sqlite3.connect(Config.SYNONYM_CACHE_PATH, timeout=30, check_same_thread=False)
+        _connection.execute("PRAGMA journal_mode=WAL")
+        _connection.execute(
+            "CREATE TABLE IF NOT EXISTS synonyms ("
+            "lang TEXT, word TEXT, synonyms TEXT, hits INTEGER DEFAULT 0, "
+            "PRIMARY KEY (lang, word))"
+        )
+    return _connection
+
+
+def get_cached_synonyms(lang: str, word: str) -> Optional[List[str]]:
+    """
+    Возвращает синонимы слова из дискового кэша или None, если слова в кэше нет.
+    Увеличивает счетчик обращений, по которому выбираются слова для предзагрузки.
+    """
+    try:
+        with _lock:
+            conn = _get_connection()
+            row = conn.execute(
+                "SELECT synonyms FROM synonyms WHERE lang=? AND word=?", (lang, word)
+            ).fetchone()
+            if row is None:
+                return None
+            with conn:
+                conn.execute("UPDATE synonyms SET hits = hits + 1 WHERE lang=? AND word=?", (lang, word))
+        return json.loads(row[0])
+    except sqlite3.Error as e:
+        print_error(f"Ошибка чтения кэша синонимов: {e}")
+        return None
+
+
+def store_synonyms(lang: str, word: str, synonyms: List[str]) -> None:
+    """Сохраняет синонимы слова в дисковый кэш."""
+    try:
+        with _lock:
+            conn = _get_connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO synonyms (lang, word, synonyms, hits) VALUES (?, ?, ?, 1)",
+                    (lang, word, json.dumps(synonyms, ensure_ascii=False))
+                )
+    except sqlite3.Error as e:
+        print_error(f"Ошибка записи кэша синонимов: {e}")
+
+
+def most_frequent_synonyms(limit: int) -> List[Tuple[str, List[str]]]:
+    """
+    Возвращает пары (слово, синонимы) с наибольшим числом обращений.
+    Счетчик обращений не изменяется, чтобы предзагрузка не влияла на выбор слов.
+    """
+    try:
+        with _lock:
+            rows = _get_connection().execute(
+                "SELECT word, synonyms FROM synonyms ORDER BY hits DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [(word, json.loads(synonyms)) for word, synonyms in rows]
+    except sqlite3.Error as e:
+        print_error(f"Ошибка чтения кэша синонимов: {e}")
+        return []
@@ -1,7 +1,12 @@
 import nltk
 from colorama import Fore, Style
-from nltk.corpus import wordnet as wn, stopwords
-from nltk.tokenize import word_tokenize
+
+# Ресурсы NLTK: путь в каталоге данных -> имя пакета для загрузки
+_NLTK_RESOURCES = (
+    ('corpora/wordnet', 'wordnet'),
+    ('corpora/stopwords', 'stopwords'),
+    ('tokenizers/punkt', 'punkt'),
+)
 
 def setup_nltk():
     """
@@ -14,24 +19,14 @@ def setup_nltk():
 
     Это позволяет избежать ошибок при первом запуске программы,
     если ресурсы NLTK ещё не загружены.
+    Наличие ресурса проверяется через nltk.data.find по каталогу данных на диске,
+    без загрузки самих словарей и моделей.
     """
-    try:
-        # Попытка получить синонимы для слова 'example' для проверки WordNet
-        wn.synsets('example')
-    except LookupError:
-        nltk.download('wordnet')
-
-    try:
-        # Проверка загрузки стоп-слов для английского языка
-        stopwords.words('english')
-    except LookupError:
-        nltk.download('stopwords')
-
-    try:
-        # Проверка загрузки модели токенизации 'punkt'
-        word_tokenize("example")
-    except LookupError:
-        nltk.download('punkt')
+    for resource, package in _NLTK_RESOURCES:
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            nltk.download(package, quiet=True)
 
 def print_success(message: str):
     """
@@ -1,5 +1,26 @@
 from whoosh import fields
-from whoosh.analysis import StemmingAnalyzer, StandardAnalyzer
+from whoosh.analysis import StemmingAnalyzer, StandardAnalyzer, STOP_WORDS as EN_STOP_WORDS
+
+# Стоп-слова русского языка (служебные слова, не несущие смысла для поиска)
+RU_STOP_WORDS = frozenset((
+    'и', 'в', 'во', 'не', 'что', 'он', 'на', 'я', 'с', 'со', 'как', 'а', 'то', 'все',
+    'она', 'так', 'его', 'но', 'да', 'ты', 'к', 'у', 'же', 'вы', 'за', 'бы', 'по',
+    'только', 'ее', 'её', 'мне', 'было', 'вот', 'от', 'меня', 'еще', 'ещё', 'нет', 'о',
+    'из', 'ему', 'теперь', 'когда', 'даже', 'ну', 'ли', 'если', 'уже', 'или', 'ни',
+    'быть', 'был', 'него', 'до', 'вас', 'нибудь', 'опять', 'уж', 'вам', 'ведь', 'там',
+    'потом', 'себя', 'ничего', 'ей', 'может', 'они', 'тут', 'где', 'есть', 'надо',
+    'ней', 'для', 'мы', 'тебя', 'их', 'чем', 'была', 'сам', 'чтоб', 'без', 'будто',
+    'чего', 'раз', 'тоже', 'себе', 'под', 'будет', 'ж', 'тогда', 'кто', 'этот', 'того',
+    'потому', 'этого', 'какой', 'совсем', 'ним', 'здесь', 'этом', 'один', 'почти',
+    'мой', 'тем', 'чтобы', 'нее', 'неё', 'были', 'куда', 'зачем', 'всех', 'можно',
+    'при', 'об', 'другой', 'хоть', 'после', 'над', 'больше', 'тот', 'через', 'эти',
+    'нас', 'про', 'всего', 'них', 'какая', 'много', 'разве', 'эту', 'моя', 'свою',
+    'этой', 'перед', 'иногда', 'лучше', 'чуть', 'том', 'нельзя', 'такой', 'им', 'более',
+    'всегда', 'конечно', 'всю', 'между', 'это',
+))
+
+# Стоп-слова удаляются анализатором при индексации и при разборе запроса
+STOP_WORDS = EN_STOP_WORDS | RU_STOP_WORDS
 
 # Схема индекса Whoosh для полнотекстового поиска
 search_schema = fields.Schema(
@@ -15,9 +36,19 @@ search_schema = fields.Schema(
         analyzer=StandardAnalyzer() # Анализатор без стемминга
     ),
 
+    # N-граммы имени файла: поиск по подстроке сводится к поиску терминов,
+    # без полного перебора словаря, как у Wildcard с ведущей '*'.
+    # Минимальный размер 2 позволяет искать по подстроке уже с двух символов
+    filename_ngrams=fields.NGRAMWORDS(
+        minsize=2,
+        maxsize=5
+    ),
+
     # Содержимое файла со стемминг-анализатором (нормализация словоформ)
     content=fields.TEXT(
-        analyzer=StemmingAnalyzer() # Приводит слова к основе (работает -> работа)
+        # Приводит слова к основе (работает -> работа) и отбрасывает
+        # стоп-слова и слова короче двух символов
+        analyzer=StemmingAnalyzer(stoplist=STOP_WORDS, minsize=2)
     ),
 
     # Дата последнего изменения файла
@@ -27,10 +58,17 @@ search_schema = fields.Schema(
 )
 
 # Типы данных для аннотаций
-from typing import Dict, TypedDict
+from datetime import datetime
+from typing import NamedTuple, Optional, TypedDict
 
-# Результат поиска: словарь с путем, оценкой релевантности и датой изменения
-SearchResult = Dict[str, str]
+# Результат поиска: путь, оценка релевантности, дата изменения и (для поиска по имени) имя файла.
+# Кортеж с именованными полями компактнее словаря, поля читаются как атрибуты;
+# при необходимости словарь можно получить через _asdict()
+class SearchResult(NamedTuple):
+    path: str
+    score: float
+    last_modified: Optional[datetime]
+    filename: Optional[str] = None
 
 # Параметры для комбинированного поиска (с проверкой типов)
 class CombinedSearchParams(TypedDict):